@@ -3,75 +3,83 @@
 Automatic batch processor for downloading Tatar songs
 """
 
-import subprocess
 import time
-import sqlite3
-import sys
+from pathlib import Path
 
-def get_pending_count():
+from download_songs import (process_songs, init_database, get_db_connection, create_session,
+                            create_parse_executor, DEFAULT_WORKERS)
+
+def get_pending_count(conn):
     """Get count of pending songs"""
-    conn = sqlite3.connect('songs.db')
     cursor = conn.cursor()
     cursor.execute('SELECT COUNT(*) FROM songs WHERE status = "pending"')
-    count = cursor.fetchone()[0]
-    conn.close()
-    return count
+    return cursor.fetchone()[0]
 
-def process_batch(batch_size=100, max_batches=None):
+def process_batch(batch_size=100, max_batches=None, workers=DEFAULT_WORKERS):
     """Process songs in batches"""
     batch_num = 0
     total_processed = 0
-    
+
+    output_dir = Path("tat")
+    output_dir.mkdir(exist_ok=True)
+
+    # Initialize database once and reuse the connections and HTTP session
+    # across all batches, so SQLite's page cache stays warm between them
+    init_database()
+    conn = get_db_connection()
+    read_conn = get_db_connection(read_only=True)
+    session = create_session(workers)
+    parse_executor = create_parse_executor()
+
+    # Later counts come back from process_songs, no extra query per batch
+    pending_count = get_pending_count(read_conn)
+
     while True:
         if max_batches and batch_num >= max_batches:
             break
-            
-        pending_count = get_pending_count()
+
         if pending_count == 0:
             print("All songs processed!")
             break
-            
+
         print(f"\n=== Batch {batch_num + 1} ===")
         print(f"Pending songs: {pending_count}")
-        
+
         # Run batch
         try:
-            result = subprocess.run([
-                sys.executable, 'download_songs.py', '--process', '--limit', str(batch_size)
-            ], capture_output=True, text=True, timeout=600)  # 10 min timeout
-            
-            if result.returncode == 0:
-                print(f"Batch {batch_num + 1} completed successfully")
-                total_processed += batch_size
-                batch_num += 1
-            else:
-                print(f"Batch {batch_num + 1} failed: {result.stderr}")
-                break
-                
-        except subprocess.TimeoutExpired:
-            print(f"Batch {batch_num + 1} timed out")
-            break
+            successful, failed, pending_count = process_songs(
+                output_dir, limit=batch_size, session=session, conn=conn,
+                read_conn=read_conn, workers=workers, parse_executor=parse_executor)
+            print(f"Batch {batch_num + 1} completed successfully")
+            total_processed += successful + failed
+            batch_num += 1
         except KeyboardInterrupt:
             print("\nInterrupted by user")
             break
         except Exception as e:
             print(f"Error running batch {batch_num + 1}: {e}")
             break
-            
+
         # Small delay between batches
         time.sleep(2)
-    
+
     print(f"\nTotal batches processed: {batch_num}")
-    print(f"Final pending count: {get_pending_count()}")
+    print(f"Final pending count: {get_pending_count(read_conn)}")
     print(f"Total processed in this run: {total_processed}")
 
+    parse_executor.shutdown()
+    read_conn.close()
+    conn.close()
+
 if __name__ == "__main__":
     import argparse
-    
+
     parser = argparse.ArgumentParser(description='Batch process Tatar songs')
     parser.add_argument('--batch-size', type=int, default=100, help='Batch size')
     parser.add_argument('--max-batches', type=int, help='Maximum number of batches')
-    
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                        help='Number of song pages to download concurrently')
+
     args = parser.parse_args()
-    
-    process_batch(args.batch_size, args.max_batches)
\ No newline at end of file
+
+    process_batch(args.batch_size, args.max_batches, args.workers)
@@ -5,9 +5,13 @@ Downloads song lyrics from https://erlar.ru/asongs with SQLite database for trac
 """
 
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from bs4 import BeautifulSoup, SoupStrainer
+import soupsieve
 import re
 import os
+import html
 from urllib.parse import urljoin
 import time
 import json
@@ -17,25 +21,112 @@ import random
 import sqlite3
 import argparse
 from datetime import datetime
+from collections import deque
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+import multiprocessing
+import threading
+
+
+# Number of song status updates to buffer before committing
+STATUS_COMMIT_BATCH = 20
+
+# Number of pending songs read from the database at a time
+PENDING_CHUNK_SIZE = 500
+
+# Default number of song pages fetched concurrently
+DEFAULT_WORKERS = 8
+
+# Seconds all workers pause after a 429 without Retry-After
+RATE_LIMIT_PAUSE = 30
+
+# Longest Retry-After, in seconds, that is honoured; longer values are cut to
+# this so one 429 can't hold a worker (or, after retries, all of them) for hours
+RETRY_AFTER_MAX = 60
+
+# Shared by all workers: no new requests are sent before this time.monotonic() value
+_paused_until = 0.0
+_pause_lock = threading.Lock()
+
+# Start method for the song parsing processes. The pool starts its workers
+# from a download thread, and fork()ing a multi-threaded process can copy
+# locks held by the other threads into the child and deadlock it
+PARSE_START_METHOD = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+
+# C-based lxml parser is several times faster than the pure-Python 'html.parser'
+HTML_PARSER = 'lxml'
+
+# CSS selectors compiled once instead of on every select() call
+SEL_SONG_LINK = soupsieve.compile('.views-field-title a')
+SEL_MUSIC = soupsieve.compile('.views-field-tid a')
+SEL_WORDS = soupsieve.compile('.views-field-tid-1 a')
+SEL_COMPOSER = soupsieve.compile('.composer a')
+SEL_AUTHOR = soupsieve.compile('.autor a')
+SEL_LYRICS = soupsieve.compile('.song')
+SEL_LYRIC_LINES = soupsieve.compile('p.line_one, p.line_two')
+
+# Song pages only need h1.title, div.songinfo and div.song; skip building
+# tags for the navigation, sidebars and footer around them. The strainer
+# compares the whole class attribute, so match single class tokens to keep
+# elements like <div class="songinfo clearfix">
+SONG_PAGE_STRAINER = SoupStrainer(class_=re.compile(r'(?:^|\s)(?:title|songinfo|song)(?:\s|$)'))
+
+# Listing page markup used by extract_songs_from_page_fast. Attribute parts
+# skip over quoted values as a whole, so a '>' inside one doesn't end the tag
+_ATTRS = r'''(?:[^>"']|"[^"]*"|'[^']*')*'''
+_ROW_RE = re.compile(r'<tr\b' + _ATTRS + r'>(.*?)</tr>', re.S | re.I)
+_CELL_RE = re.compile(r'<td\b' + _ATTRS + r'?(?<![\w-])class="([^"]*)"' + _ATTRS + r'>(.*?)</td>', re.S | re.I)
+_LINK_RE = re.compile(r'<a\b(' + _ATTRS + r')>(.*?)</a>', re.S | re.I)
+_HREF_RE = re.compile(r'(?<![\w-])href="([^"]*)"', re.I)
+# Any href attribute, including quoting _HREF_RE doesn't read
+_ANY_HREF_RE = re.compile(r'(?<![\w-])href\s*=', re.I)
+_TD_RE = re.compile(r'<td\b', re.I)
+# Column classes that extract_songs_from_page reads through its CSS selectors
+_FIELD_CLASS_RE = re.compile(r'(?<![\w-])(views-field-title|views-field-tid(?:-1)?)(?![\w-])')
+
+
+USER_AGENTS = (
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.1 Safari/605.1.15',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:121.0) Gecko/20100101 Firefox/121.0',
+    'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36',
+)
+
+DEFAULT_HEADERS = {
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'ru-RU,ru;q=0.8,en-US;q=0.5,en;q=0.3',
+    'Accept-Encoding': 'gzip, deflate, br',
+    'DNT': '1',
+    'Connection': 'keep-alive',
+    'Upgrade-Insecure-Requests': '1',
+}
 
 
 def get_random_user_agent():
     """Get a random user agent to avoid blocking"""
-    user_agents = [
-        'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-        'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-        'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.1 Safari/605.1.15',
-        'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:121.0) Gecko/20100101 Firefox/121.0',
-        'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-        'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36',
-        'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36',
-    ]
-    return random.choice(user_agents)
+    return random.choice(USER_AGENTS)
+
+
+def _configure_connection(conn, read_only=False):
+    """Apply performance PRAGMAs to a freshly opened connection"""
+    # WAL is persistent for the database file (set by the writer);
+    # the rest are per-connection
+    if not read_only:
+        conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.execute('PRAGMA temp_store=MEMORY')
+    conn.execute('PRAGMA cache_size=-65536')
+    conn.execute('PRAGMA mmap_size=268435456')
+    conn.execute('PRAGMA busy_timeout=5000')
+    return conn
 
 
 def init_database():
     """Initialize SQLite database for tracking songs"""
-    conn = sqlite3.connect('songs.db')
+    conn = get_db_connection()
     cursor = conn.cursor()
     
     cursor.execute('''
@@ -60,81 +151,245 @@ def init_database():
     conn.close()
 
 
-def get_db_connection():
-    """Get database connection"""
-    return sqlite3.connect('songs.db')
+def get_db_connection(read_only=False):
+    """Get database connection
+
+    Writes go through a single read-write connection. Read-only connections
+    can be opened next to it: in WAL mode they read without blocking the
+    writer and are not blocked by its open transaction.
+    """
+    if read_only:
+        return _configure_connection(sqlite3.connect('file:songs.db?mode=ro', uri=True), read_only=True)
+    return _configure_connection(sqlite3.connect('songs.db'))
+
+
+class CappedRetry(Retry):
+    """urllib3 Retry that sleeps at most RETRY_AFTER_MAX seconds for Retry-After"""
+
+    def get_retry_after(self, response):
+        retry_after = super().get_retry_after(response)
+        if retry_after is None:
+            return None
+        return min(retry_after, RETRY_AFTER_MAX)
+
+
+def create_session(pool_size=DEFAULT_WORKERS, max_retries=3):
+    """Create HTTP session with browser-like default headers
+
+    The connection pool is sized for `pool_size` concurrent requests so that
+    every worker keeps its keep-alive connection instead of having it
+    discarded when the pool is full. Connection errors, timeouts, 429 and
+    5xx answers are retried up to `max_retries` times (so a request is
+    sent at most max_retries + 1 times) with exponential backoff. A 429's
+    Retry-After is honoured up to RETRY_AFTER_MAX seconds, during which
+    that worker's thread sleeps.
+    """
+    session = requests.Session()
+    retry = CappedRetry(
+        total=max_retries,
+        backoff_factor=1,
+        status_forcelist=(429, 500, 502, 503, 504),
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers.update(DEFAULT_HEADERS)
+    return session
+
+
+TATAR_TO_LATIN = {
+    'А': 'A', 'Б': 'B', 'В': 'V', 'Г': 'G', 'Д': 'D', 'Е': 'E', 'Ё': 'Yo',
+    'Ж': 'Zh', 'Җ': 'C', 'З': 'Z', 'И': 'I', 'Й': 'Y', 'К': 'K', 'Л': 'L',
+    'М': 'M', 'Н': 'N', 'Ң': 'N', 'О': 'O', 'Ө': 'O', 'П': 'P', 'Р': 'R',
+    'С': 'S', 'Т': 'T', 'У': 'U', 'Ү': 'U', 'Ф': 'F', 'Х': 'H', 'Һ': 'H',
+    'Ц': 'Ts', 'Ч': 'Ch', 'Ш': 'Sh', 'Щ': 'Shch', 'Ъ': '', 'Ы': 'I', 'Ә': 'A',
+    'Ь': '', 'Э': 'E', 'Ю': 'Yu', 'Я': 'Ya',
+    'а': 'a', 'б': 'b', 'в': 'v', 'г': 'g', 'д': 'd', 'е': 'e', 'ё': 'yo',
+    'ж': 'zh', 'җ': 'c', 'з': 'z', 'и': 'i', 'й': 'y', 'к': 'k', 'л': 'l',
+    'м': 'm', 'н': 'n', 'ң': 'n', 'о': 'o', 'ө': 'o', 'п': 'p', 'р': 'r',
+    'с': 's', 'т': 't', 'у': 'u', 'ү': 'u', 'ф': 'f', 'х': 'h', 'һ': 'h',
+    'ц': 'ts', 'ч': 'ch', 'ш': 'sh', 'щ': 'shch', 'ъ': '', 'ы': 'i', 'ә': 'a',
+    'ь': '', 'э': 'e', 'ю': 'yu', 'я': 'ya'
+}
+
+# str.translate table built once; multi-character replacements are supported
+_TRANSLIT_TABLE = str.maketrans(TATAR_TO_LATIN)
+
+_NON_WORD_RE = re.compile(r'[^\w\s-]')
+_WHITESPACE_RE = re.compile(r'\s+')
+_UNSAFE_FILENAME_RE = re.compile(r'[<>:"/\\|?*]')
+
+# Filename helpers are pure functions of the song metadata; cache them for
+# songs that share artist and title (variants of the same song)
+FILENAME_CACHE_SIZE = 4096
 
 
+@lru_cache(maxsize=FILENAME_CACHE_SIZE)
 def transliterate_tatar_to_latin(text):
     """Transliterate Tatar text from Cyrillic to Latin script"""
-    mapping = {
-        'А': 'A', 'Б': 'B', 'В': 'V', 'Г': 'G', 'Д': 'D', 'Е': 'E', 'Ё': 'Yo',
-        'Ж': 'Zh', 'Җ': 'C', 'З': 'Z', 'И': 'I', 'Й': 'Y', 'К': 'K', 'Л': 'L',
-        'М': 'M', 'Н': 'N', 'Ң': 'N', 'О': 'O', 'Ө': 'O', 'П': 'P', 'Р': 'R',
-        'С': 'S', 'Т': 'T', 'У': 'U', 'Ү': 'U', 'Ф': 'F', 'Х': 'H', 'Һ': 'H',
-        'Ц': 'Ts', 'Ч': 'Ch', 'Ш': 'Sh', 'Щ': 'Shch', 'Ъ': '', 'Ы': 'I', 'Ә': 'A',
-        'Ь': '', 'Э': 'E', 'Ю': 'Yu', 'Я': 'Ya',
-        'а': 'a', 'б': 'b', 'в': 'v', 'г': 'g', 'д': 'd', 'е': 'e', 'ё': 'yo',
-        'ж': 'zh', 'җ': 'c', 'з': 'z', 'и': 'i', 'й': 'y', 'к': 'k', 'л': 'l',
-        'м': 'm', 'н': 'n', 'ң': 'n', 'о': 'o', 'ө': 'o', 'п': 'p', 'р': 'r',
-        'с': 's', 'т': 't', 'у': 'u', 'ү': 'u', 'ф': 'f', 'х': 'h', 'һ': 'h',
-        'ц': 'ts', 'ч': 'ch', 'ш': 'sh', 'щ': 'shch', 'ъ': '', 'ы': 'i', 'ә': 'a',
-        'ь': '', 'э': 'e', 'ю': 'yu', 'я': 'ya'
-    }
-    
-    result = []
-    for char in text:
-        result.append(mapping.get(char, char))
-    
     # Convert to lowercase and replace spaces with underscores
-    latin_text = ''.join(result).lower()
+    latin_text = text.translate(_TRANSLIT_TABLE).lower()
     # Remove special characters and replace multiple spaces with single underscore
-    latin_text = re.sub(r'[^\w\s-]', '', latin_text)
-    latin_text = re.sub(r'\s+', '_', latin_text)
+    latin_text = _NON_WORD_RE.sub('', latin_text)
+    latin_text = _WHITESPACE_RE.sub('_', latin_text)
     return latin_text
 
 
+@lru_cache(maxsize=FILENAME_CACHE_SIZE)
 def sanitize_filename(filename):
     """Create safe filename from song title"""
     # Remove any characters that aren't safe for filenames
-    filename = re.sub(r'[<>:"/\\|?*]', '', filename)
+    filename = _UNSAFE_FILENAME_RE.sub('', filename)
     # Replace multiple spaces with single underscore
-    filename = re.sub(r'\s+', '_', filename)
+    filename = _WHITESPACE_RE.sub('_', filename)
     # Remove leading/trailing underscores and spaces
     filename = filename.strip('_ ')
     return filename
 
 
-def get_page_content(url, session, max_retries=3):
-    """Get page content with error handling and retries"""
-    for attempt in range(max_retries):
-        try:
-            # Random delay before each request
-            delay = random.uniform(0.5, 2.0)
-            time.sleep(delay)
-            
-            # Update user agent for each request
-            session.headers.update({'User-Agent': get_random_user_agent()})
-            
-            response = session.get(url, timeout=8)
-            response.raise_for_status()
-            return response.text
-        except requests.RequestException as e:
-            print(f"Attempt {attempt + 1} failed for {url}: {e}")
-            if attempt < max_retries - 1:
-                time.sleep(random.uniform(2, 5))  # Random backoff
-            else:
-                print(f"Failed to fetch {url} after {max_retries} attempts")
+def pause_requests(seconds):
+    """Hold back new requests from all workers for the given number of seconds"""
+    global _paused_until
+    with _pause_lock:
+        _paused_until = max(_paused_until, time.monotonic() + seconds)
+
+
+def wait_if_paused():
+    """Sleep while requests are paused after the server pushed back"""
+    delay = _paused_until - time.monotonic()
+    if delay > 0:
+        time.sleep(delay)
+
+
+def get_retry_after(response):
+    """Get Retry-After header value in seconds (at most RETRY_AFTER_MAX), or None if missing or not a number"""
+    try:
+        return min(float(response.headers['Retry-After']), RETRY_AFTER_MAX)
+    except (KeyError, ValueError):
+        return None
+
+
+def get_page_content(url, session):
+    """Get page content with error handling
+
+    Retries with exponential backoff happen in the session's adapter (see
+    create_session). If the server is still answering 429 after those,
+    all workers pause before sending their next request.
+    """
+    wait_if_paused()
+    try:
+        # Rotate user agent per request; passed per call rather than set on the
+        # session because the session is shared between worker threads
+        response = session.get(url, headers={'User-Agent': get_random_user_agent()}, timeout=8)
+        response.raise_for_status()
+        return response.text
+    except requests.RequestException as e:
+        print(f"Failed to fetch {url}: {e}")
+        response = e.response
+        if response is not None and response.status_code == 429:
+            pause_requests(get_retry_after(response) or RATE_LIMIT_PAUSE)
+        return None
+
+
+def _link_text(html_fragment):
+    """Plain text of a link body, or None if it contains nested markup"""
+    if '<' in html_fragment:
+        return None
+    return html.unescape(html_fragment).strip()
+
+
+def _first_link_text(cell):
+    """Text of the first link in a table cell ("" if there is none), or None on unexpected markup"""
+    if cell is None:
+        return ""
+    match = _LINK_RE.search(cell)
+    if not match:
+        return ""
+    return _link_text(match.group(2))
+
+
+def extract_songs_from_page_fast(html_content, base_url):
+    """Extract song links from a page with regexes instead of building a DOM
+
+    Relies on the Drupal views table layout of the listing pages: one <tr>
+    per song with <td class="views-field views-field-title|tid|tid-1">
+    cells holding plain-text links. Returns None when the page doesn't look
+    like that, or when a row has markup the regexes can't read exactly
+    (e.g. single-quoted attributes), so the caller can fall back to
+    BeautifulSoup instead of silently losing songs.
+    """
+    songs = []
+    # Whether the text between the previous row and this one leaves an HTML
+    # comment open, i.e. the row is commented out
+    in_comment = False
+    previous_end = 0
+    
+    for row in _ROW_RE.finditer(html_content):
+        gap = html_content[previous_end:row.start()]
+        previous_end = row.end()
+        comment_start, comment_end = gap.rfind('<!--'), gap.rfind('-->')
+        if comment_start != comment_end:
+            in_comment = comment_start > comment_end
+        
+        row_html = row.group(1)
+        # BeautifulSoup skips comments; the regexes would read cells inside them
+        if in_comment or '<!--' in row_html:
+            return None
+        
+        # Header rows only have <th> cells
+        if not _TD_RE.search(row_html):
+            continue
+        
+        cells = {}
+        for cell_classes, cell in _CELL_RE.findall(row_html):
+            for cell_class in cell_classes.split():
+                cells.setdefault(cell_class, cell)
+        
+        # A column class that no matched cell carries means markup _CELL_RE missed
+        if not cells.keys() >= set(_FIELD_CLASS_RE.findall(row_html)):
+            return None
+        
+        title_cell = cells.get('views-field-title')
+        if title_cell is None:
+            continue
+        
+        musician = _first_link_text(cells.get('views-field-tid'))
+        songwriter = _first_link_text(cells.get('views-field-tid-1'))
+        if musician is None or songwriter is None:
+            return None
+        
+        for attrs, text in _LINK_RE.findall(title_cell):
+            href = _HREF_RE.search(attrs)
+            if href is None and _ANY_HREF_RE.search(attrs):
                 return None
+            href = html.unescape(href.group(1)) if href else None
+            if href and href.startswith('/node/'):
+                title = _link_text(text)
+                if title is None:
+                    return None
+                if title:
+                    songs.append({
+                        'url': urljoin(base_url, href),
+                        'title': title,
+                        'musician': musician,
+                        'songwriter': songwriter
+                    })
+    
+    return songs or None
 
 
 def extract_songs_from_page(html_content, base_url):
     """Extract song links from a page"""
-    soup = BeautifulSoup(html_content, 'html.parser')
+    songs = extract_songs_from_page_fast(html_content, base_url)
+    if songs is not None:
+        return songs
+    
+    soup = BeautifulSoup(html_content, HTML_PARSER)
     songs = []
     
     # Find all song links in table - looking for links in the title column
-    song_links = soup.select('.views-field-title a')
+    song_links = SEL_SONG_LINK.select(soup)
     
     for link in song_links:
         href = link.get('href')
@@ -149,12 +404,12 @@ def extract_songs_from_page(html_content, base_url):
                 
                 if row:
                     # Get musician (music column)
-                    music_cell = row.select_one('.views-field-tid a')
+                    music_cell = SEL_MUSIC.select_one(row)
                     if music_cell:
                         musician = music_cell.get_text(strip=True)
                     
                     # Get songwriter (words column)
-                    words_cell = row.select_one('.views-field-tid-1 a')
+                    words_cell = SEL_WORDS.select_one(row)
                     if words_cell:
                         songwriter = words_cell.get_text(strip=True)
                 
@@ -170,7 +425,7 @@ def extract_songs_from_page(html_content, base_url):
 
 def extract_lyrics_from_song_page(html_content, song_url):
     """Extract lyrics and metadata from individual song page"""
-    soup = BeautifulSoup(html_content, 'html.parser')
+    soup = BeautifulSoup(html_content, HTML_PARSER, parse_only=SONG_PAGE_STRAINER)
     
     # Extract title from h1
     title_element = soup.find('h1', class_='title')
@@ -183,31 +438,24 @@ def extract_lyrics_from_song_page(html_content, song_url):
     songinfo = soup.find('div', class_='songinfo')
     if songinfo:
         # Get musician (composer)
-        composer_elem = songinfo.select_one('.composer a')
+        composer_elem = SEL_COMPOSER.select_one(songinfo)
         if composer_elem:
             musician = composer_elem.get_text(strip=True)
         
         # Get songwriter (author)
-        autor_elem = songinfo.select_one('.autor a')
+        autor_elem = SEL_AUTHOR.select_one(songinfo)
         if autor_elem:
             songwriter = autor_elem.get_text(strip=True)
     
     # Extract lyrics from the song div
-    lyrics_element = soup.select_one('.song')
+    lyrics_element = SEL_LYRICS.select_one(soup)
     lyrics = ""
     
     if lyrics_element:
-        # Remove the rating form and other unwanted elements
-        for unwanted in lyrics_element.find_all(['form', 'div']):
-            if 'fivestar' in unwanted.get('class', []):
-                unwanted.decompose()
-        
-        # Get all text from p tags with line_one and line_two classes
-        lyric_lines = []
-        for p in lyrics_element.find_all('p', class_=['line_one', 'line_two']):
-            # Get text and clean up line breaks
-            text = p.get_text('\n', strip=True)
-            lyric_lines.append(text)
+        # Get the text of the p tags with line_one and line_two classes,
+        # keeping their line breaks. The fivestar rating form inside .song
+        # never contains these paragraphs, so it doesn't need to be removed first.
+        lyric_lines = [p.get_text('\n', strip=True) for p in SEL_LYRIC_LINES.select(lyrics_element)]
         
         lyrics = '\n\n'.join(lyric_lines)
     
@@ -266,47 +514,76 @@ def generate_filename(song_data):
     return filename + ".md"
 
 
-def collect_all_songs(base_url, session, start_page=0, max_pages=268):
-    """Collect all song links from pagination pages"""
+def fetch_listing_page(page_url, base_url, session):
+    """Fetch and parse one pagination page, returns None if it could not be fetched"""
+    page_content = get_page_content(page_url, session)
+    
+    # Small delay between pages of the same worker to be respectful
+    time.sleep(random.uniform(1.0, 3.0))
+    
+    if not page_content:
+        return None
+    return extract_songs_from_page(page_content, base_url)
+
+
+def store_listing_page(conn, seen_urls, page_num, page_songs):
+    """Insert the songs of one pagination page that haven't been seen yet"""
+    if page_songs is None:
+        print(f"Skipping page {page_num} due to errors")
+        return
+    
+    print(f"Found {len(page_songs)} songs on page {page_num}")
+    
+    # Skip songs already seen, then insert the rest in a single
+    # transaction per page
+    new_songs = []
+    for song in page_songs:
+        if song['url'] not in seen_urls:
+            seen_urls.add(song['url'])
+            new_songs.append(song)
+    
+    added = 0
+    if new_songs:
+        cursor = conn.executemany('''
+            INSERT INTO songs (url, title, musician, songwriter)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(url) DO NOTHING
+        ''', [(song['url'], song['title'], song['musician'], song['songwriter'])
+              for song in new_songs])
+        added = cursor.rowcount
+        conn.commit()
+    print(f"Added {added} new songs from page {page_num}")
+
+
+def collect_all_songs(base_url, session, start_page=0, max_pages=268, workers=DEFAULT_WORKERS):
+    """Collect all song links from pagination pages
+
+    Pages are fetched by `workers` threads and stored in page order.
+    """
     if session is None:
-        session = requests.Session()
-        session.headers.update({
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'ru-RU,ru;q=0.8,en-US;q=0.5,en;q=0.3',
-            'Accept-Encoding': 'gzip, deflate, br',
-            'DNT': '1',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1',
-        })
+        session = create_session(workers)
     
     conn = get_db_connection()
     cursor = conn.cursor()
     
+    # URLs already stored or seen during this run; duplicates across pages
+    # are dropped here without touching the url index
+    seen_urls = {row[0] for row in cursor.execute('SELECT url FROM songs')}
+    
     print(f"Collecting songs from pages {start_page} to {max_pages-1}...")
     
-    for page_num in range(start_page, max_pages):
-        page_url = f"{base_url}?page={page_num}"
-        print(f"Scraping page: {page_url}")
-        
-        page_content = get_page_content(page_url, session)
-        if not page_content:
-            print(f"Skipping page {page_num} due to errors")
-            continue
-        
-        page_songs = extract_songs_from_page(page_content, base_url)
-        print(f"Found {len(page_songs)} songs on page {page_num}")
-        
-        # Insert songs into database
-        for song in page_songs:
-            cursor.execute('''
-                INSERT OR IGNORE INTO songs (url, title, musician, songwriter)
-                VALUES (?, ?, ?, ?)
-            ''', (song['url'], song['title'], song['musician'], song['songwriter']))
-        
-        conn.commit()
-        
-        # Small delay between pages to be respectful
-        time.sleep(random.uniform(1.0, 3.0))
+    executor = ThreadPoolExecutor(max_workers=workers)
+    results = map_bounded(
+        executor,
+        lambda page_num: fetch_listing_page(f"{base_url}?page={page_num}", base_url, session),
+        range(start_page, max_pages),
+        window=workers * 2
+    )
+    try:
+        for page_num, page_songs in results:
+            store_listing_page(conn, seen_urls, page_num, page_songs)
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
     
     total_songs = cursor.execute('SELECT COUNT(*) FROM songs').fetchone()[0]
     print(f"Total songs collected in database: {total_songs}")
@@ -314,99 +591,199 @@ def collect_all_songs(base_url, session, start_page=0, max_pages=268):
     conn.close()
 
 
-def process_songs(output_dir, limit=None, test_mode=False):
-    """Process songs from database"""
-    conn = get_db_connection()
+def iter_pending_songs(conn, limit=None, chunk_size=PENDING_CHUNK_SIZE):
+    """Yield (id, url, title) of pending songs in id order, reading chunk_size rows at a time
+
+    Paging by the last seen id (rather than OFFSET) stays correct while the
+    rows already yielded are being updated to another status.
+    """
+    last_id = 0
+    remaining = limit
+    while remaining is None or remaining > 0:
+        size = chunk_size if remaining is None else min(chunk_size, remaining)
+        rows = conn.execute(
+            'SELECT id, url, title FROM songs WHERE status = "pending" AND id > ? ORDER BY id LIMIT ?',
+            (last_id, size)
+        ).fetchall()
+        if not rows:
+            return
+        yield from rows
+        last_id = rows[-1][0]
+        if remaining is not None:
+            remaining -= len(rows)
+
+
+def create_parse_executor():
+    """Create the process pool used to parse song pages, without fork()ing the threaded parent"""
+    return ProcessPoolExecutor(mp_context=multiprocessing.get_context(PARSE_START_METHOD))
+
+
+def fetch_song(song_url, session, parse_executor=None):
+    """Fetch and parse a single song page, returns None if the page could not be fetched
+
+    With a parse_executor (a process pool) the CPU-bound parsing runs in
+    another process, so parsing doesn't hold the GIL the other download
+    threads need.
+    """
+    song_content = get_page_content(song_url, session)
+    if not song_content:
+        return None
+    if parse_executor is None:
+        return extract_lyrics_from_song_page(song_content, song_url)
+    return parse_executor.submit(extract_lyrics_from_song_page, song_content, song_url).result()
+
+
+def map_bounded(executor, func, items, window):
+    """Like executor.map, but keeps at most `window` items in flight and yields (item, result) in order"""
+    in_flight = deque()
+    for item in items:
+        in_flight.append((item, executor.submit(func, item)))
+        if len(in_flight) >= window:
+            item, future = in_flight.popleft()
+            yield item, future.result()
+    while in_flight:
+        item, future = in_flight.popleft()
+        yield item, future.result()
+
+
+def flush_status_updates(conn, failed_ids, processed_rows):
+    """Write buffered song status updates in one transaction and clear the buffers"""
+    if not failed_ids and not processed_rows:
+        return
+    
     cursor = conn.cursor()
+    if failed_ids:
+        cursor.executemany('UPDATE songs SET status = "failed" WHERE id = ?', failed_ids)
+    if processed_rows:
+        cursor.executemany('''
+            UPDATE songs 
+            SET status = "processed", 
+                processed_at = CURRENT_TIMESTAMP,
+                lyrics = ?,
+                filename = ?
+            WHERE id = ?
+        ''', processed_rows)
+    conn.commit()
+    
+    failed_ids.clear()
+    processed_rows.clear()
+
+
+def count_markdown_files(directory):
+    """Count .md files in a directory without building Path objects"""
+    with os.scandir(directory) as entries:
+        return sum(1 for entry in entries if entry.name.endswith('.md'))
+
+
+def process_songs(output_dir, limit=None, test_mode=False, session=None, conn=None,
+                  read_conn=None, workers=DEFAULT_WORKERS, parse_executor=None):
+    """Process songs from database
+
+    Song pages are fetched by `workers` threads and parsed in the
+    `parse_executor` process pool; files and database updates are written
+    from the calling thread only, through `conn`. Pending songs are read
+    through the separate `read_conn`.
+    An existing session, database connections and process pool can be
+    passed in so that callers running several batches keep them alive
+    between calls.
+    
+    Returns (successful, failed, remaining pending) counts.
+    """
+    own_conn = conn is None
+    if own_conn:
+        conn = get_db_connection()
+    own_read_conn = read_conn is None
+    if own_read_conn:
+        read_conn = get_db_connection(read_only=True)
+    cursor = read_conn.cursor()
     
     if test_mode:
         # Get 100 random songs for testing
-        cursor.execute('SELECT * FROM songs WHERE status = "pending" ORDER BY RANDOM() LIMIT 100')
+        cursor.execute('SELECT id, url, title FROM songs WHERE status = "pending" ORDER BY RANDOM() LIMIT 100')
+        pending_songs = cursor.fetchall()
+        total_pending = len(pending_songs)
     else:
-        # Get pending songs (with optional limit)
-        if limit:
-            cursor.execute('SELECT * FROM songs WHERE status = "pending" LIMIT ?', (limit,))
-        else:
-            cursor.execute('SELECT * FROM songs WHERE status = "pending"')
+        # Stream pending songs (with optional limit) instead of loading them all
+        cursor.execute('SELECT COUNT(*) FROM (SELECT 1 FROM songs WHERE status = "pending" LIMIT ?)',
+                       (limit or -1,))
+        total_pending = cursor.fetchone()[0]
+        pending_songs = iter_pending_songs(read_conn, limit or None)
     
-    pending_songs = cursor.fetchall()
-    print(f"Found {len(pending_songs)} songs to process")
+    print(f"Found {total_pending} songs to process")
     
-    # Configure session
-    session = requests.Session()
-    session.headers.update({
-        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-        'Accept-Language': 'ru-RU,ru;q=0.8,en-US;q=0.5,en;q=0.3',
-        'Accept-Encoding': 'gzip, deflate, br',
-        'DNT': '1',
-        'Connection': 'keep-alive',
-        'Upgrade-Insecure-Requests': '1',
-    })
+    if session is None:
+        session = create_session(workers)
     
     successful_downloads = 0
     failed_downloads = 0
     
-    for i, song in enumerate(pending_songs, 1):
-        song_id = song[0]
-        song_url = song[1]
-        song_title = song[2]
-        
-        print(f"Processing song {i}/{len(pending_songs)}: {song_title}")
-        
-        song_content = get_page_content(song_url, session)
-        if not song_content:
-            print(f"Failed to fetch song: {song_title}")
-            cursor.execute('UPDATE songs SET status = "failed" WHERE id = ?', (song_id,))
-            failed_downloads += 1
-            conn.commit()
-            continue
-        
-        song_data = extract_lyrics_from_song_page(song_content, song_url)
-        
-        if not song_data['lyrics']:
-            print(f"No lyrics found for: {song_title}")
-            cursor.execute('UPDATE songs SET status = "failed" WHERE id = ?', (song_id,))
-            failed_downloads += 1
-            conn.commit()
-            continue
-        
-        # Generate filename
-        filename = generate_filename(song_data)
-        
-        # Format and save
-        markdown_content = format_lyrics_markdown(song_data)
-        
-        file_path = output_dir / filename
-        try:
-            with open(file_path, 'w', encoding='utf-8') as f:
-                f.write(markdown_content)
+    # Status updates are buffered and committed every STATUS_COMMIT_BATCH songs
+    failed_ids = []
+    processed_rows = []
+    
+    own_parse_executor = parse_executor is None
+    if own_parse_executor:
+        parse_executor = create_parse_executor()
+    
+    executor = ThreadPoolExecutor(max_workers=workers)
+    results = map_bounded(executor, lambda song: fetch_song(song[1], session, parse_executor),
+                          pending_songs, window=workers * 2)
+    try:
+        for i, (song, song_data) in enumerate(results, 1):
+            song_id = song[0]
+            song_title = song[2]
             
-            # Update database with success
-            cursor.execute('''
-                UPDATE songs 
-                SET status = "processed", 
-                    processed_at = CURRENT_TIMESTAMP,
-                    lyrics = ?,
-                    filename = ?
-                WHERE id = ?
-            ''', (song_data['lyrics'], filename, song_id))
+            print(f"Processing song {i}/{total_pending}: {song_title}")
             
-            successful_downloads += 1
-            print(f"Saved: {filename}")
-        except Exception as e:
-            print(f"Failed to save {filename}: {e}")
-            cursor.execute('UPDATE songs SET status = "failed" WHERE id = ?', (song_id,))
-            failed_downloads += 1
-        
-        conn.commit()
-        
-        # Small delay between requests
-        time.sleep(0.3)
-    
-    conn.close()
+            if song_data is None:
+                print(f"Failed to fetch song: {song_title}")
+                failed_ids.append((song_id,))
+                failed_downloads += 1
+            elif not song_data['lyrics']:
+                print(f"No lyrics found for: {song_title}")
+                failed_ids.append((song_id,))
+                failed_downloads += 1
+            else:
+                # Generate filename
+                filename = generate_filename(song_data)
+                
+                # Format and save
+                markdown_content = format_lyrics_markdown(song_data)
+                
+                file_path = output_dir / filename
+                try:
+                    # Single write call and no fsync per file; progress is
+                    # tracked durably in the database
+                    file_path.write_text(markdown_content, encoding='utf-8')
+                    
+                    processed_rows.append((song_data['lyrics'], filename, song_id))
+                    successful_downloads += 1
+                    print(f"Saved: {filename}")
+                except Exception as e:
+                    print(f"Failed to save {filename}: {e}")
+                    failed_ids.append((song_id,))
+                    failed_downloads += 1
+            
+            if len(failed_ids) + len(processed_rows) >= STATUS_COMMIT_BATCH:
+                flush_status_updates(conn, failed_ids, processed_rows)
+    finally:
+        # Don't start queued downloads on interrupt, and never lose buffered results
+        executor.shutdown(wait=True, cancel_futures=True)
+        if own_parse_executor:
+            parse_executor.shutdown(wait=True, cancel_futures=True)
+        flush_status_updates(conn, failed_ids, processed_rows)
+    
+    remaining_pending = cursor.execute('SELECT COUNT(*) FROM songs WHERE status = "pending"').fetchone()[0]
+    
+    if own_read_conn:
+        read_conn.close()
+    if own_conn:
+        conn.close()
     
     print(f"Done! Successfully downloaded {successful_downloads} songs. Failed: {failed_downloads}")
-    print(f"Total files in {output_dir}/: {len(list(output_dir.glob('*.md')))}")
+    print(f"Total files in {output_dir}/: {count_markdown_files(output_dir)}")
+    
+    return successful_downloads, failed_downloads, remaining_pending
 
 
 def main():
@@ -417,6 +794,8 @@ def main():
     parser.add_argument('--max-pages', type=int, default=268, help='Maximum pages to collect')
     parser.add_argument('--limit', type=int, help='Limit number of songs to process')
     parser.add_argument('--test', action='store_true', help='Process 100 random songs for testing')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                        help='Number of pages to download concurrently')
     
     args = parser.parse_args()
     
@@ -427,12 +806,15 @@ def main():
     # Initialize database
     init_database()
     
+    # One session for the whole run so collection and processing share connections
+    session = create_session(args.workers)
+    
     if args.collect or not any([args.collect, args.process]):
         # Collect songs by default
-        collect_all_songs(base_url, None, args.start_page, args.max_pages)
+        collect_all_songs(base_url, session, args.start_page, args.max_pages, workers=args.workers)
     
     if args.process:
-        process_songs(output_dir, args.limit, args.test)
+        process_songs(output_dir, args.limit, args.test, session=session, workers=args.workers)
 
 
 if __name__ == "__main__":
@@ -9,6 +9,7 @@ import os
 import re
 import json
 import subprocess
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from difflib import SequenceMatcher
 from typing import Dict, List, Set, Tuple, Optional
@@ -21,6 +22,22 @@ AUTO_MERGE_MIN_DIFF_RATIO = 2.0  # One name used 2x more than other (was 5.0)
 AUTO_MERGE_MIN_ABS_DIFF = 3  # At least 3 files difference (was 10)
 AUTO_MERGE_VERY_HIGH_SIMILARITY = 0.95  # Auto-merge at 95%+ similarity regardless of count
 
+# Headers with pattern: ### Name1 / Name2 - Song Title or ### Name - Song Title
+HEADER_NAMES_RE = re.compile(r'^###\s+(.+?)\s+-', re.MULTILINE)
+# Trailing variants like "(первый вариант)"
+TRAILING_PARENS_RE = re.compile(r'\s*\([^)]*\)\s*$')
+
+# Mapping of Tatar/Russian character variations to canonical form
+TATAR_NORMALIZATION = str.maketrans({
+    'ә': 'е',  # Tatar schwa -> Russian e
+    'э': 'е',  # э -> е
+    'ө': 'о',  # Tatar ö -> Russian o
+    'ү': 'у',  # Tatar ü -> Russian u
+    'ң': 'н',  # Tatar ñ -> Russian n
+    'җ': 'ж',  # Tatar j -> Russian zh
+    'һ': 'х',  # Tatar h -> Russian kh
+})
+
 
 def extract_names_from_file(filepath: str) -> Set[str]:
     """Extract all person names from a markdown file."""
@@ -30,8 +47,7 @@ def extract_names_from_file(filepath: str) -> Set[str]:
 
     # Find all headers with pattern: ### Name1 / Name2 - Song Title
     # or ### Name - Song Title
-    pattern = r'^###\s+(.+?)\s+-'
-    matches = re.findall(pattern, content, re.MULTILINE)
+    matches = HEADER_NAMES_RE.findall(content)
 
     for match in matches:
         # Split by '/' and extract names
@@ -40,29 +56,32 @@ def extract_names_from_file(filepath: str) -> Set[str]:
             # Extract the name part (before dash if any)
             name = part.split('-')[0].strip()
             # Remove any trailing variants like "(первый вариант)"
-            name = re.sub(r'\s*\([^)]*\)\s*$', '', name).strip()
+            name = TRAILING_PARENS_RE.sub('', name).strip()
             if name:
                 names.add(name)
 
     return names
 
 
-def collect_all_names(translated_dir: str) -> Dict[str, List[str]]:
+def collect_all_names(translated_dir: str) -> Dict[str, Set[str]]:
     """
     Collect all names from all files.
-    Returns dict: name -> list of files where it appears
+    Returns dict: name -> set of files where it appears
     """
-    all_names: Dict[str, List[str]] = {}
+    all_names: Dict[str, Set[str]] = {}
 
+    filepaths = []
     for root, dirs, files in os.walk(translated_dir):
         for file in files:
             if file.endswith('.md'):
-                filepath = os.path.join(root, file)
-                names = extract_names_from_file(filepath)
-                for name in names:
-                    if name not in all_names:
-                        all_names[name] = []
-                    all_names[name].append(filepath)
+                filepaths.append(os.path.join(root, file))
+
+    # Parse files in worker processes; map keeps results in walk order
+    with ProcessPoolExecutor() as executor:
+        results = executor.map(extract_names_from_file, filepaths, chunksize=64)
+        for filepath, names in zip(filepaths, results):
+            for name in names:
+                all_names.setdefault(name, set()).add(filepath)
 
     return all_names
 
@@ -72,22 +91,7 @@ def normalize_tatar_text(text: str) -> str:
     Normalize Tatar text by replacing similar characters with canonical forms.
     This helps identify names that differ only in Tatar-specific character variations.
     """
-    # Mapping of Tatar/Russian character variations to canonical form
-    replacements = {
-        'ә': 'е',  # Tatar schwa -> Russian e
-        'э': 'е',  # э -> е
-        'ө': 'о',  # Tatar ö -> Russian o
-        'ү': 'у',  # Tatar ü -> Russian u
-        'ң': 'н',  # Tatar ñ -> Russian n
-        'җ': 'ж',  # Tatar j -> Russian zh
-        'һ': 'х',  # Tatar h -> Russian kh
-    }
-
-    normalized = text.lower()
-    for old_char, new_char in replacements.items():
-        normalized = normalized.replace(old_char, new_char)
-
-    return normalized
+    return text.lower().translate(TATAR_NORMALIZATION)
 
 
 def similar(a: str, b: str) -> float:
@@ -95,40 +99,103 @@ def similar(a: str, b: str) -> float:
     return SequenceMatcher(None, normalize_tatar_text(a), normalize_tatar_text(b)).ratio()
 
 
-def find_similar_names(all_names: Dict[str, List[str]]) -> List[Tuple[str, str, float]]:
+def find_similar_names(all_names: Dict[str, Set[str]]) -> List[Tuple[str, str, float]]:
     """Find pairs of similar names."""
     names_list = sorted(all_names.keys())
-    similar_pairs = []
-
-    for i, name1 in enumerate(names_list):
-        for name2 in names_list[i + 1:]:
-            sim_ratio = similar(name1, name2)
-            if sim_ratio >= SIMILARITY_THRESHOLD:
-                similar_pairs.append((name1, name2, sim_ratio))
-
-    # Sort by similarity (descending)
-    similar_pairs.sort(key=lambda x: x[2], reverse=True)
-    return similar_pairs
+    found = []
+
+    # Group names by normalized form: names in the same group differ only
+    # by Tatar character variations and are a 100% match without comparing
+    groups: Dict[str, List[int]] = {}
+    for i, name in enumerate(names_list):
+        groups.setdefault(normalize_tatar_text(name), []).append(i)
+
+    for i_list in groups.values():
+        for k, i in enumerate(i_list):
+            for j in i_list[k + 1:]:
+                found.append((i, j, 1.0))
+
+    # Compare groups in order of length, so that once the length difference
+    # alone rules out the threshold, longer keys can be skipped entirely
+    keys = sorted(groups, key=len)
+    # One matcher per second string: SequenceMatcher caches its index of
+    # seq2 and only recomputes the seq1-dependent parts on set_seq1()
+    matchers = {key: SequenceMatcher(None, '', key) for key in keys}
+    for pos, key1 in enumerate(keys):
+        len1 = len(key1)
+        for key2 in keys[pos + 1:]:
+            len2 = len(key2)
+            if 2.0 * len1 / (len1 + len2) < SIMILARITY_THRESHOLD:
+                break
+            for i in groups[key1]:
+                for j in groups[key2]:
+                    # Keep the original (earlier name, later name) argument order
+                    if i < j:
+                        matcher = matchers[key2]
+                        matcher.set_seq1(key1)
+                    else:
+                        matcher = matchers[key1]
+                        matcher.set_seq1(key2)
+                    # Cheap upper bound before the full ratio
+                    if matcher.quick_ratio() < SIMILARITY_THRESHOLD:
+                        continue
+                    sim_ratio = matcher.ratio()
+                    if sim_ratio >= SIMILARITY_THRESHOLD:
+                        found.append((min(i, j), max(i, j), sim_ratio))
+
+    # Sort by similarity (descending), then by name order
+    found.sort(key=lambda x: (-x[2], x[0], x[1]))
+    return [(names_list[i], names_list[j], sim_ratio) for i, j, sim_ratio in found]
+
+
+def names_in_header_pattern(names) -> re.Pattern:
+    """
+    Compiled regex matching any of the names in headers.
+    Match name either after ### or after /
+    Pattern 1: ### [whitespace] name [whitespace] [/ or -]
+    Pattern 2: / [whitespace] name [whitespace] [- or end]
+    The delimiter after the name is a lookahead, so several names
+    in one header ("### A / B - Title") are matched in a single pass.
+    """
+    alternatives = '|'.join(re.escape(name) for name in sorted(names, key=len, reverse=True))
+    return re.compile(rf'(###\s+|/\s*)({alternatives})(?=\s*(?:/|-|$))', re.MULTILINE)
 
 
-def merge_names(names_dict: Dict[str, List[str]], from_name: str, to_name: str) -> int:
+def apply_merges(merges: List[Tuple[str, str, Set[str]]]) -> int:
     """
-    Replace all occurrences of from_name with to_name in files.
+    Apply queued merges (from_name, to_name, files), rewriting each file once.
+    Chained merges (A -> B, then B -> C) end up as the last kept name.
     Returns number of files modified.
     """
+    targets: Dict[str, str] = {}
+    names_per_file: Dict[str, Set[str]] = {}
+    for from_name, to_name, filepaths in merges:
+        targets[from_name] = to_name
+        for filepath in filepaths:
+            names_per_file.setdefault(filepath, set()).add(from_name)
+
+    # Resolve chains to the name that is finally kept
+    for from_name in targets:
+        to_name = targets[from_name]
+        while to_name in targets:
+            to_name = targets[to_name]
+        targets[from_name] = to_name
+
+    pattern = names_in_header_pattern(targets)
     files_modified = 0
-    from_name_escaped = re.escape(from_name)
 
-    for filepath in names_dict.get(from_name, []):
+    for filepath in sorted(names_per_file):
+        names = names_per_file[filepath]
         with open(filepath, 'r', encoding='utf-8') as f:
             content = f.read()
 
-        # Replace the name in headers
-        # Match name either after ### or after /
-        # Pattern 1: ### [whitespace] name [whitespace] [/ or -]
-        # Pattern 2: / [whitespace] name [whitespace] [- or end]
-        pattern = rf'(###\s+|/\s*){re.escape(from_name)}(\s*(?:/|-|$))'
-        new_content = re.sub(pattern, rf'\1{to_name}\2', content, flags=re.MULTILINE)
+        # Replace only the names that were merged for this file
+        def replace(match, names=names):
+            if match.group(2) in names:
+                return match.group(1) + targets[match.group(2)]
+            return match.group(0)
+
+        new_content = pattern.sub(replace, content)
 
         if new_content != content:
             with open(filepath, 'w', encoding='utf-8') as f:
@@ -139,10 +206,27 @@ def merge_names(names_dict: Dict[str, List[str]], from_name: str, to_name: str)
     return files_modified
 
 
+def flush_merges(
+    pending_merges: List[Tuple[str, str, Set[str]]],
+    seen_file: str,
+    seen_pairs: Set[Tuple[str, str]]
+) -> None:
+    """Write queued merges to files, then save reviewed pairs."""
+    if pending_merges:
+        print(f"\n🔄 Applying {len(pending_merges)} queued merge(s)...")
+        count = apply_merges(pending_merges)
+        print(f"✅ Updated {count} file(s)")
+        pending_merges.clear()
+    save_seen_pairs(seen_file, seen_pairs)
+
+
 def save_seen_pairs(seen_file: str, seen_pairs: Set[Tuple[str, str]]) -> None:
     """Save pairs that user has already reviewed."""
+    # Compact separators and raw UTF-8 instead of \uXXXX escapes for Cyrillic,
+    # written with a single call
+    data = json.dumps(list(seen_pairs), ensure_ascii=False, separators=(',', ':'))
     with open(seen_file, 'w', encoding='utf-8') as f:
-        json.dump(list(seen_pairs), f)
+        f.write(data)
 
 
 def load_seen_pairs(seen_file: str) -> Set[Tuple[str, str]]:
@@ -157,7 +241,7 @@ def get_staged_files() -> Set[str]:
     """Get set of staged markdown files in translated directory."""
     try:
         result = subprocess.run(
-            ['git', 'diff', '--cached', '--name-only', '--diff-filter=ACM'],
+            ['git', 'diff', '--cached', '--name-only', '--diff-filter=ACM', '-z'],
             capture_output=True,
             text=True,
             check=False
@@ -165,10 +249,11 @@ def get_staged_files() -> Set[str]:
         if result.returncode != 0:
             return set()
 
+        # NUL-separated, unquoted paths; empty output gives no entries
         staged = set()
-        for line in result.stdout.strip().split('\n'):
-            if line.startswith('translated/') and line.endswith('.md'):
-                staged.add(line)
+        for path in result.stdout.split('\0'):
+            if path.startswith('translated/') and path.endswith('.md'):
+                staged.add(path)
         return staged
     except Exception:
         return set()
@@ -187,7 +272,7 @@ def get_staged_names(staged_files: Set[str]) -> Set[str]:
 def get_automated_decision(
     name1: str,
     name2: str,
-    all_names: Dict[str, List[str]],
+    all_names: Dict[str, Set[str]],
     staged_names: Set[str],
     sim_ratio: float
 ) -> Optional[Tuple[str, str]]:
@@ -294,6 +379,8 @@ def main():
 
     auto_merged = 0
     manual_review = 0
+    # Merges are written in batches: each file is rewritten once per batch
+    pending_merges: List[Tuple[str, str, Set[str]]] = []
 
     for name1, name2, sim_ratio in new_pairs:
         # Skip if either name was already merged in a previous iteration
@@ -308,6 +395,9 @@ def main():
             # Automated merge
             keep_name, replace_name = action
             auto_merged += 1
+            replace_files = all_names.pop(replace_name)
+            keep_count = len(all_names[keep_name])
+            replace_count = len(replace_files)
 
             # Determine reason for auto-merge
             reason_parts = []
@@ -315,30 +405,27 @@ def main():
                 reason_parts.append(f"very high similarity ({sim_ratio:.2%})")
             if keep_name in staged_names and replace_name not in staged_names:
                 reason_parts.append("found in staged files")
-            if len(all_names[keep_name]) > len(all_names[replace_name]):
-                ratio = len(all_names[keep_name]) / len(all_names[replace_name]) if len(all_names[replace_name]) > 0 else float('inf')
+            if keep_count > replace_count:
+                ratio = keep_count / replace_count if replace_count > 0 else float('inf')
                 reason_parts.append(f"{ratio:.1f}x more usage")
 
             print(f"\n{'='*70}")
             print(f"🤖 Auto-merging ({sim_ratio:.2%} match):")
             print(f"  '{replace_name}' -> '{keep_name}'")
             print(f"  Reason: {', '.join(reason_parts)}")
-            print(f"  Files: '{keep_name}' in {len(all_names[keep_name])}, '{replace_name}' in {len(all_names[replace_name])}")
+            print(f"  Files: '{keep_name}' in {keep_count}, '{replace_name}' in {replace_count}")
 
             if not args.dry_run:
-                print(f"\n  🔄 Replacing '{replace_name}' with '{keep_name}'...")
-                count = merge_names(all_names, replace_name, keep_name)
-                print(f"  ✅ Updated {count} file(s)")
+                print(f"  🔄 Queued replacing '{replace_name}' with '{keep_name}' in {replace_count} file(s)")
+                pending_merges.append((replace_name, keep_name, replace_files))
             else:
-                print(f"  [DRY RUN] Would update {len(all_names[replace_name])} file(s)")
+                print(f"  [DRY RUN] Would update {replace_count} file(s)")
 
-            # Update the dictionary for future comparisons
-            all_names[keep_name].extend(all_names[replace_name])
-            del all_names[replace_name]
+            # Update the dictionary for future comparisons; a file that
+            # had both names is counted once
+            all_names[keep_name] |= replace_files
 
             seen_pairs.add((name1, name2))
-            if not args.dry_run:
-                save_seen_pairs(seen_file, seen_pairs)
             continue
 
         # Manual review required
@@ -362,12 +449,15 @@ def main():
             seen_pairs.add((name1, name2))
             continue
 
+        # Write queued merges before waiting for input
+        flush_merges(pending_merges, seen_file, seen_pairs)
+
         while True:
             try:
                 response = input("\nChoose action:\n  [s]kip - Skip this pair\n  [m]erge - Merge names\n  [q]uit - Quit script\n\nYour choice: ").strip().lower()
             except EOFError:
                 print("\n\n👋 EOF detected, exiting...")
-                save_seen_pairs(seen_file, seen_pairs)
+                flush_merges(pending_merges, seen_file, seen_pairs)
                 return
 
             if response in ('s', 'skip', ''):
@@ -392,27 +482,28 @@ def main():
                     seen_pairs.add((name1, name2))
                     break
 
-                print(f"\n  🔄 Replacing '{replace_name}' with '{keep_name}'...")
-                count = merge_names(all_names, replace_name, keep_name)
-                print(f"  ✅ Updated {count} file(s)")
+                replace_files = all_names.pop(replace_name)
+                pending_merges.append((replace_name, keep_name, replace_files))
 
                 # Update the dictionary for future comparisons
-                all_names[keep_name].extend(all_names[replace_name])
-                del all_names[replace_name]
+                all_names[keep_name] |= replace_files
 
                 seen_pairs.add((name1, name2))
                 break
 
             elif response in ('q', 'quit'):
                 print("\n👋 Quitting...")
-                save_seen_pairs(seen_file, seen_pairs)
+                flush_merges(pending_merges, seen_file, seen_pairs)
                 return
 
             else:
                 print("  ❌ Invalid choice, please try again")
 
         # Save progress after each pair
-        save_seen_pairs(seen_file, seen_pairs)
+        flush_merges(pending_merges, seen_file, seen_pairs)
+
+    if not args.dry_run:
+        flush_merges(pending_merges, seen_file, seen_pairs)
 
     print(f"\n{'='*70}")
     print("✅ Done! All pairs reviewed.")
@@ -1,18 +1,67 @@
 #!/usr/bin/env python3
+import codecs
+import io
+import json
 import os
 import re
+import sys
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from operator import attrgetter
 from pathlib import Path
 
+# The original title appears after "# Оригинал", the translated one after "# Перевод"
+ORIGINAL_TITLE_RE = re.compile(r'# Оригинал\s*\n\s*###\s*([^\n]+)')
+TRANSLATED_TITLE_RE = re.compile(r'# Перевод\s*\n\s*###\s*([^\n]+)')
+
+# Both titles are near the top of a file, so only its start is read first
+HEADER_READ_SIZE = 4096
+
+# Threads for reading translated files; the work is mostly file I/O
+PARSE_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+
+# Titles of already parsed files, keyed by their path relative to the
+# translated directory, so unchanged files are not read again
+TITLE_CACHE_PATH = Path(".songs_cache.json")
+# Bump when parse_translated_file or the title regexes change, so titles
+# parsed under the old rules are thrown away instead of reused
+TITLE_CACHE_VERSION = 1
+
+# Songs listed on each songs_list/SONGS_N.md page
+SONGS_PER_PAGE = 100
+
+# A song listed on the pages; sort_key is the casefolded original title
+Song = namedtuple('Song', 'filename original_title translated_title sort_key')
+
+# Markdown shared by the song pages and README.md
+PAGE_TITLE = "# Татарские песни и их перевод"
+SEPARATOR = "\n---\n\n"
+# Link back to README.md from the song pages
+HOME_PAGE_LINK = "[Главная страница](../README.md)"
+
 def parse_translated_file(filepath):
     """Parse a translated file and extract original and translated song names."""
     try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            content = f.read()
-        
-        # Extract the original title (appears after "# Оригинал")
-        original_title_match = re.search(r'# Оригинал\s*\n\s*###\s*([^\n]+)', content)
-        # Extract the translated title (appears after "# Перевод")
-        translated_title_match = re.search(r'# Перевод\s*\n\s*###\s*([^\n]+)', content)
+        with open(filepath, 'rb') as f:
+            # Decode the bytes directly; the incremental decoder keeps a
+            # character split at the end of the header for the rest of the file
+            decoder = codecs.getincrementaldecoder('utf-8')()
+            header = f.read(HEADER_READ_SIZE)
+            content = decoder.decode(header, final=len(header) < HEADER_READ_SIZE)
+            
+            # Extract the original title (appears after "# Оригинал")
+            original_title_match = ORIGINAL_TITLE_RE.search(content)
+            # Extract the translated title (appears after "# Перевод")
+            translated_title_match = TRANSLATED_TITLE_RE.search(content)
+            
+            # Read the rest of the file if a title is missing or its line
+            # may continue past what has been read
+            if len(header) == HEADER_READ_SIZE and not all(
+                    match and match.end() < len(content)
+                    for match in (original_title_match, translated_title_match)):
+                content += decoder.decode(f.read(), final=True)
+                original_title_match = ORIGINAL_TITLE_RE.search(content)
+                translated_title_match = TRANSLATED_TITLE_RE.search(content)
         
         original_title = original_title_match.group(1).strip() if original_title_match else None
         translated_title = translated_title_match.group(1).strip() if translated_title_match else None
@@ -22,10 +71,68 @@ def parse_translated_file(filepath):
         print(f"Error parsing {filepath}: {e}")
         return None, None
 
+def find_markdown_files(directory, prefix='', files=None):
+    """
+    Find .md files in directory and its subdirectories using os.scandir.
+    Returns (path, relative path, [mtime_ns, size]) tuples, sorted by path components
+    like sorted(Path.glob()).
+    """
+    if files is None:
+        files = []
+    
+    # Visiting each directory's entries in name order yields the files
+    # already sorted, so only the names are compared
+    with os.scandir(directory) as entries:
+        entries = sorted(entries, key=attrgetter('name'))
+    for entry in entries:
+        if entry.is_dir():
+            find_markdown_files(entry.path, prefix + entry.name + os.sep, files)
+        elif entry.name.endswith('.md') and entry.is_file():
+            stat = entry.stat()
+            files.append((entry.path, prefix + entry.name, [stat.st_mtime_ns, stat.st_size]))
+    
+    return files
+
+def load_title_cache():
+    """
+    Load the cached file entries, or return an empty cache if it is missing,
+    unreadable or was written for another TITLE_CACHE_VERSION.
+    """
+    try:
+        with open(TITLE_CACHE_PATH, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(cache, dict) or cache.get('version') != TITLE_CACHE_VERSION:
+        return {}
+    files = cache.get('files')
+    return files if isinstance(files, dict) else {}
+
+def save_title_cache(files):
+    """Save the file entries to the title cache, tagged with TITLE_CACHE_VERSION."""
+    with open(TITLE_CACHE_PATH, 'w', encoding='utf-8') as f:
+        json.dump({'version': TITLE_CACHE_VERSION, 'files': files}, f,
+                  ensure_ascii=False, separators=(',', ':'))
+
+def write_if_changed(path, content):
+    """Write content to path unless the file already has exactly that content."""
+    # Encode once; the bytes are both compared and written in binary mode
+    data = content.encode('utf-8')
+    try:
+        if Path(path).read_bytes() == data:
+            return False
+    except FileNotFoundError:
+        pass
+    with open(path, 'wb') as f:
+        f.write(data)
+    return True
+
 def create_song_pages(songs):
-    """Create paginated song files (SONGS_1.md, SONGS_2.md, etc.) with 100 songs per file."""
-    songs_per_page = 100
-    songs_sorted = sorted(songs, key=lambda x: x['original_title'].lower())
+    """Create paginated song files (SONGS_1.md, SONGS_2.md, etc.) with SONGS_PER_PAGE songs per file."""
+    songs_per_page = SONGS_PER_PAGE
+    # Songs sort by their casefolded original title; casefold() is the
+    # caseless comparison form and orders Cyrillic titles the same as lower()
+    songs_sorted = sorted(songs, key=attrgetter('sort_key'))
     
     # Create songs_list directory if it doesn't exist
     songs_list_dir = Path("songs_list")
@@ -36,6 +143,8 @@ def create_song_pages(songs):
     num_pages = (total_songs + songs_per_page - 1) // songs_per_page
     
     page_files = []
+    # (first song, last song) numbers shown for each page
+    page_ranges = []
     
     for page_num in range(1, num_pages + 1):
         start_idx = (page_num - 1) * songs_per_page
@@ -43,80 +152,65 @@ def create_song_pages(songs):
         page_songs = songs_sorted[start_idx:end_idx]
         
         # Create content for this page
-        page_content = [f"# Татарские песни и их перевод - Страница {page_num}\n"]
-        page_content.append(f"## Список песен (песни {start_idx + 1}-{end_idx} из {total_songs})\n")
+        page_content = io.StringIO()
+        page_content.write(f"{PAGE_TITLE} - Страница {page_num}\n\n")
+        page_content.write(f"## Список песен (песни {start_idx + 1}-{end_idx} из {total_songs})\n\n")
         
-        # Add navigation links
+        # Navigation links, shown at the top and at the bottom of the page
         if num_pages > 1:
             nav_links = []
             if page_num > 1:
                 nav_links.append(f"[← Предыдущая страница](SONGS_{page_num-1}.md)")
-            nav_links.append(f"[Главная страница](../README.md)")
+            nav_links.append(HOME_PAGE_LINK)
             if page_num < num_pages:
                 nav_links.append(f"[Следующая страница →](SONGS_{page_num+1}.md)")
-            page_content.append(" | ".join(nav_links) + "\n")
+            navigation = " | ".join(nav_links)
+            page_content.write(navigation + "\n\n")
         
-        page_content.append("")
+        page_content.write("\n")
         
         # Add songs for this page
         for song in page_songs:
-            filename = song['filename']
-            original_title = song['original_title']
-            translated_title = song['translated_title']
-            link_text = f"{original_title} / {translated_title}"
-            link = f"[{link_text}](../translated/{filename})"
-            page_content.append(f"- {link}")
-        
-        page_content.append("")
+            page_content.write(f"- [{song.original_title} / {song.translated_title}](../translated/{song.filename})\n")
         
         # Add navigation links at bottom
         if num_pages > 1:
-            nav_links = []
-            if page_num > 1:
-                nav_links.append(f"[← Предыдущая страница](SONGS_{page_num-1}.md)")
-            nav_links.append(f"[Главная страница](../README.md)")
-            if page_num < num_pages:
-                nav_links.append(f"[Следующая страница →](SONGS_{page_num+1}.md)")
-            page_content.append("---\n")
-            page_content.append(" | ".join(nav_links))
+            page_content.write(SEPARATOR)
+            page_content.write(navigation)
         
-        # Write page file in songs_list directory
+        # Write page file in songs_list directory, unless it is unchanged
         page_filename = songs_list_dir / f"SONGS_{page_num}.md"
-        with open(page_filename, 'w', encoding='utf-8') as f:
-            f.write('\n'.join(page_content))
+        write_if_changed(page_filename, page_content.getvalue())
         
         page_files.append(f"songs_list/SONGS_{page_num}.md")
+        page_ranges.append((start_idx + 1, end_idx))
         print(f"Created {page_filename} with {len(page_songs)} songs")
     
-    return page_files, num_pages
+    return page_files, num_pages, page_ranges
 
-def update_readme(page_files, num_pages, total_songs):
-    """Update README.md with links to song pages."""
+def update_readme(page_files, page_ranges, total_songs):
+    """Update README.md with links to song pages, using the song ranges from create_song_pages."""
     readme_path = Path("README.md")
     
     # Create README content
-    readme_content = ["# Татарские песни и их перевод\n"]
-    readme_content.append(f"Всего песен: {total_songs}\n")
-    readme_content.append("## Список песен\n")
+    readme_content = io.StringIO()
+    readme_content.write(PAGE_TITLE + "\n\n")
+    readme_content.write(f"Всего песен: {total_songs}\n\n")
+    readme_content.write("## Список песен\n\n")
     
-    if num_pages == 1:
+    if len(page_files) == 1:
         # If only one page, add a direct link
-        readme_content.append(f"- [Все песни]({page_files[0]})\n")
+        readme_content.write(f"- [Все песни]({page_files[0]})\n\n")
     else:
         # Create links to each page
-        for i, page_file in enumerate(page_files, 1):
-            start_song = (i - 1) * 100 + 1
-            end_song = min(i * 100, total_songs)
-            readme_content.append(f"- [Песни {start_song}-{end_song}]({page_file})")
+        for page_file, (start_song, end_song) in zip(page_files, page_ranges):
+            readme_content.write(f"- [Песни {start_song}-{end_song}]({page_file})\n")
     
-    readme_content.append("")
-    readme_content.append("---")
-    readme_content.append("")
-    readme_content.append("*Эта страница автоматически генерируется скриптом `update_readme.py`*")
+    readme_content.write(SEPARATOR)
+    readme_content.write("*Эта страница автоматически генерируется скриптом `update_readme.py`*")
     
-    # Write to README.md
-    with open(readme_path, 'w', encoding='utf-8') as f:
-        f.write('\n'.join(readme_content))
+    # Write to README.md, leaving it untouched if nothing changed
+    write_if_changed(readme_path, readme_content.getvalue())
 
 def main():
     translated_dir = Path("translated")
@@ -125,29 +219,56 @@ def main():
         print(f"Error: {translated_dir} directory not found")
         return
     
-    songs = []
-
-    # Get all .md files in translated directory and subdirectories
-    for filepath in sorted(translated_dir.glob("**/*.md")):
-        original_title, translated_title = parse_translated_file(filepath)
-        if original_title and translated_title:
-            # Get relative path from translated directory (e.g., "a/song.md")
-            relative_path = filepath.relative_to(translated_dir)
-            songs.append({
-                'filename': str(relative_path),
-                'original_title': original_title,
-                'translated_title': translated_title
-            })
-            print(f"Processed: {relative_path} -> {original_title} / {translated_title}")
+    # Get all .md files in translated directory and subdirectories, with
+    # their path relative to the translated directory (e.g., "a/song.md")
+    markdown_files = find_markdown_files(translated_dir)
+    
+    # Files whose mtime and size match the cache keep their cached titles
+    cache = load_title_cache()
+    new_cache = {}
+    changed_files = []
+    for filepath, relative_path, file_key in markdown_files:
+        entry = cache.get(relative_path)
+        if isinstance(entry, list) and len(entry) == 4 and entry[:2] == file_key:
+            new_cache[relative_path] = entry
+        else:
+            changed_files.append(filepath)
+    
+    # Parse changed files in a thread pool; map keeps the results in file order
+    with ThreadPoolExecutor(max_workers=PARSE_WORKERS) as executor:
+        parsed_titles = iter(executor.map(parse_translated_file, changed_files))
+    
+    titles = []
+    for filepath, relative_path, file_key in markdown_files:
+        if relative_path in new_cache:
+            titles.append(tuple(new_cache[relative_path][2:]))
         else:
-            print(f"Could not extract titles from: {filepath.name}")
+            original_title, translated_title = next(parsed_titles)
+            # Files without both titles are parsed again on the next run
+            if original_title and translated_title:
+                new_cache[relative_path] = file_key + [original_title, translated_title]
+            titles.append((original_title, translated_title))
+    
+    songs = [Song(relative_path, original_title, translated_title, original_title.casefold())
+             for (_, relative_path, _), (original_title, translated_title) in zip(markdown_files, titles)
+             if original_title and translated_title]
+    
+    # Per-file messages are written to stdout in one call, in file order
+    log_lines = [f"Processed: {relative_path} -> {original_title} / {translated_title}\n"
+                 if original_title and translated_title else
+                 f"Could not extract titles from: {os.path.basename(filepath)}\n"
+                 for (filepath, relative_path, _), (original_title, translated_title) in zip(markdown_files, titles)]
+    sys.stdout.write(''.join(log_lines))
+    
+    if new_cache != cache:
+        save_title_cache(new_cache)
     
     if songs:
         # Create paginated song files
-        page_files, num_pages = create_song_pages(songs)
+        page_files, num_pages, page_ranges = create_song_pages(songs)
         
         # Update main README with links to pages
-        update_readme(page_files, num_pages, len(songs))
+        update_readme(page_files, page_ranges, len(songs))
         
         print(f"\nCreated {num_pages} page(s) with {len(songs)} total songs")
         print(f"Updated README.md with links to song pages")